@@ -2,6 +2,7 @@ import streamlit as st
 from pygwalker.api.streamlit import StreamlitRenderer
 import pandas as pd
 import xml.etree.ElementTree as ET
+import threading
 import requests
 import plotly.graph_objects as go
 from zeep import Client
@@ -22,6 +23,17 @@ def fmt(valor: float) -> str:
     return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
+@st.cache_resource
+def trava_pygwalker() -> threading.Lock:
+    """Trava compartilhada por todas as sessões para montar o PyGWalker.
+
+    O PyGWalker consulta os dados pela conexão padrão do duckdb, global ao
+    processo, registrando sempre a mesma tabela; renderizadores montados ao
+    mesmo tempo em sessões diferentes travam a instância inteira.
+    """
+    return threading.Lock()
+
+
 def buscar_dados(coligada: int, ano: int) -> pd.DataFrame:
     """Conecta ao Web Service do RM e retorna os dados como DataFrame."""
     wsdl_url   = st.session_state.get("wsdl_url")
@@ -71,14 +83,102 @@ def buscar_dados(coligada: int, ano: int) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def particionar(df: pd.DataFrame, coligada: int, ano: int) -> dict:
+    """Totais mensais (Proventos, Descontos) do ano consultado, chaveados por (coligada, ano, mês).
+
+    Linhas de outro ano ou sem mês de competência válido (ANOCOMP/MESCOMP
+    ausentes viram 0 em ``buscar_dados``) ficam de fora da partição.
+    """
+    df = df[(df["Ano"] == ano) & df["Mês"].between(1, 12)]
+    totais = (df.groupby(["Ano", "Mês", "Tipo Evento"])["Valor"].sum()
+                .unstack("Tipo Evento")
+                .reindex(columns=["Provento", "Desconto"])
+                .fillna(0))
+    return {
+        (coligada, int(ano), int(mes)): (float(prov), float(desc))
+        for (ano, mes), prov, desc in zip(totais.index, totais["Provento"], totais["Desconto"])
+    }
+
+
+def adicionar_particoes(particoes: dict, df: pd.DataFrame, coligada: int, ano: int) -> dict:
+    """Substitui no armazenamento as partições do ano consultado.
+
+    Todas as chaves (coligada, ano, *) anteriores são descartadas antes da
+    gravação, para que uma nova consulta com menos meses não deixe sobras;
+    as partições de outros anos já carregados são mantidas como estão.
+    """
+    novas = particionar(df, coligada, ano)
+    if any(k[:2] != (coligada, ano) for k in novas):
+        raise ValueError(f"Partições fora de ({coligada}, {ano}) na consulta: {sorted(novas)}")
+    for chave in [k for k in particoes if k[:2] == (coligada, ano)]:
+        del particoes[chave]
+    particoes.update(novas)
+    return particoes
+
+
+def matriz_mensal(particoes: dict, coligada: int) -> pd.DataFrame:
+    """Totais de Proventos, Descontos e Saldo por (Ano, Mês) de uma coligada.
+
+    Retorna colunas em dois níveis (medida, ano) indexadas pelo mês 1–12, de
+    forma que anos diferentes fiquem alinhados pela chave do mês.
+    """
+    linhas = [(ano, mes, prov, desc) for (col, ano, mes), (prov, desc) in particoes.items() if col == coligada]
+    if not linhas:
+        return pd.DataFrame()
+
+    totais = pd.DataFrame(linhas, columns=["Ano", "Mês", "Proventos", "Descontos"])
+    totais["Saldo"] = totais["Proventos"] - totais["Descontos"]
+    matriz = totais.pivot_table(index="Mês", columns="Ano", values=["Proventos", "Descontos", "Saldo"], aggfunc="sum")
+    return matriz.reindex(index=range(1, 13))
+
+
+def variacao_anual(matriz: pd.DataFrame, medida: str) -> pd.DataFrame:
+    """Variação ano contra ano (%) de uma medida, mês a mês.
+
+    Os anos são completados para um intervalo contínuo antes do deslocamento,
+    assim cada coluna é comparada com o ano imediatamente anterior (ou vazio).
+    """
+    valores  = matriz[medida]
+    valores  = valores.reindex(columns=range(valores.columns.min(), valores.columns.max() + 1))
+    anterior = valores.shift(1, axis=1)
+    variacao = (valores - anterior) / anterior.abs() * 100
+    return variacao.replace([float("inf"), float("-inf")], float("nan")).round(1)
+
+
+def acumulado_anual(matriz: pd.DataFrame, medida: str) -> pd.DataFrame:
+    """Valor acumulado no ano (YTD) de uma medida, mês a mês."""
+    return matriz[medida].cumsum()
+
+
+def grafico_comparativo_anual(matriz: pd.DataFrame, medida: str, acumulado: bool = False):
+    valores = acumulado_anual(matriz, medida) if acumulado else matriz[medida]
+    meses   = [MESES[m] for m in valores.index]
+
+    fig = go.Figure()
+    for ano in valores.columns:
+        serie = valores[ano]
+        if serie.isna().all():
+            continue
+        fig.add_trace(go.Scatter(x=meses, y=serie, name=str(ano), mode="lines+markers",
+            marker=dict(size=6), connectgaps=False,
+            hovertemplate=f"<b>{ano}</b> — %{{x}}<br>R$ %{{y:,.2f}}<extra></extra>"))
+
+    titulo = f"📅 {medida} {'Acumulado no Ano' if acumulado else 'Mensal'} — Comparativo entre Anos"
+    fig.update_layout(title=titulo, xaxis_title="Mês", yaxis_title="Valor (R$)", height=400,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", font=dict(color="white"),
+        xaxis=dict(gridcolor="rgba(255,255,255,0.1)"), yaxis=dict(gridcolor="rgba(255,255,255,0.1)"))
+    return fig
+
+
 def grafico_proventos_descontos_saldo(df: pd.DataFrame):
     grp = df.groupby(["Ano", "Mês", "Tipo Evento"])["Valor"].sum().reset_index()
-    grp["Período"] = grp["Mês"].astype(str).str.zfill(2) + "/" + grp["Ano"].astype(str)
-    pivot = grp.pivot_table(index="Período", columns="Tipo Evento", values="Valor", aggfunc="sum").fillna(0).reset_index()
-    pivot = pivot.sort_values("Período")
+    pivot = grp.pivot_table(index=["Ano", "Mês"], columns="Tipo Evento", values="Valor", aggfunc="sum").fillna(0).reset_index()
+    pivot = pivot.sort_values(["Ano", "Mês"])
+    pivot["Período"] = pivot["Mês"].astype(str).str.zfill(2) + "/" + pivot["Ano"].astype(str)
 
-    provento = pivot.get("Provento", pd.Series([0]*len(pivot)))
-    desconto = pivot.get("Desconto", pd.Series([0]*len(pivot)))
+    provento = pivot.get("Provento", pd.Series([0]*len(pivot), index=pivot.index))
+    desconto = pivot.get("Desconto", pd.Series([0]*len(pivot), index=pivot.index))
     saldo    = provento - desconto
 
     fig = go.Figure()
@@ -234,6 +334,44 @@ def grafico_comprometimento(df: pd.DataFrame, limiar: float, agrupamento: str):
     return fig, alertas, grp
 
 
+def secao_comparativo_anual():
+    """Seção do comparativo entre anos, montada a partir das partições já carregadas."""
+    st.subheader("📅 Comparativo entre Anos")
+
+    matriz = matriz_mensal(st.session_state.get("particoes", {}), int(st.session_state["param_coligada"]))
+    anos_carregados = sorted(matriz["Saldo"].columns.tolist()) if not matriz.empty else []
+    st.caption(
+        f"Anos carregados para a coligada **{st.session_state['param_coligada']}**: "
+        f"**{', '.join(str(a) for a in anos_carregados) or '-'}**. "
+        "Consulte outros anos para acrescentá-los à comparação. "
+        "O comparativo cobre a coligada inteira e não aplica os filtros da página."
+    )
+
+    if not matriz.empty:
+        medida_comp = st.radio(
+            "📐 Medida",
+            options=["Saldo", "Proventos", "Descontos"],
+            horizontal=True,
+            key="comp_medida"
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(grafico_comparativo_anual(matriz, medida_comp), use_container_width=True)
+        with col2:
+            st.plotly_chart(grafico_comparativo_anual(matriz, medida_comp, acumulado=True), use_container_width=True)
+
+        if len(anos_carregados) > 1:
+            df_var = variacao_anual(matriz, medida_comp).iloc[:, 1:]
+            df_var = df_var.loc[:, df_var.notna().any()]
+            if not df_var.empty:
+                with st.expander(f"📋 Variação ano contra ano — {medida_comp} (%)"):
+                    df_var_fmt = df_var.apply(lambda s: s.map(lambda v: "-" if pd.isna(v) else f"{v:+.1f}%"))
+                    df_var_fmt.index   = [MESES[m] for m in df_var_fmt.index]
+                    df_var_fmt.columns = [f"{a} x {a-1}" for a in df_var_fmt.columns]
+                    st.dataframe(df_var_fmt, use_container_width=True)
+
+
 # ============================================================
 # LAYOUT DO DASHBOARD
 # ============================================================
@@ -242,6 +380,7 @@ st.set_page_config(page_title="Ficha Financeira - RM TOTVS", page_icon="📊", l
 # Inicializa todas as chaves do session_state para evitar KeyError
 _defaults = {
     "df": pd.DataFrame(),
+    "particoes": {},
     "param_coligada": "1",
     "param_ano": 2024,
     "executar_consulta": False,
@@ -304,6 +443,7 @@ with st.expander("⚙️ Configurações de Conexão", expanded=not conexao_ok):
             st.session_state["conexao_ok"]    = True
             # Limpa dados anteriores ao trocar conexão
             st.session_state.pop("df", None)
+            st.session_state.pop("particoes", None)
             st.success(f"✅ Conexão configurada! URL: `{st.session_state['wsdl_url']}`")
             st.rerun()
 
@@ -351,6 +491,14 @@ if st.session_state.get("executar_consulta"):
             int(st.session_state["param_coligada"]),
             int(st.session_state["param_ano"])
         )
+    # Acrescenta as partições do ano consultado sem reprocessar os anos já carregados
+    if not st.session_state["df"].empty and {"Ano", "Mês", "Tipo Evento", "Valor"} <= set(st.session_state["df"].columns):
+        adicionar_particoes(
+            st.session_state.setdefault("particoes", {}),
+            st.session_state["df"],
+            int(st.session_state["param_coligada"]),
+            int(st.session_state["param_ano"])
+        )
     # Sinaliza que a consulta foi executada (para distinguir de "ainda não consultou")
     st.session_state["consultou"] = True
 
@@ -364,6 +512,9 @@ if not st.session_state.get("consultou"):
 # Consultou mas não retornou dados
 if df.empty or "Ano" not in df.columns:
     st.warning(f"⚠️ Dados não encontrados para a Coligada **{st.session_state['param_coligada']}** / Ano **{st.session_state['param_ano']}**. Favor verificar o ano informado.")
+    if st.session_state.get("particoes"):
+        st.markdown("---")
+        secao_comparativo_anual()
     st.stop()
 
 colunas_esperadas = ["Ano", "Mês", "Nome", "Tipo Evento", "Evento", "Valor", "Empresa"]
@@ -461,6 +612,13 @@ with col2:
 
 st.markdown("---")
 
+# ============================================================
+# COMPARATIVO ENTRE ANOS
+# ============================================================
+secao_comparativo_anual()
+
+st.markdown("---")
+
 # ============================================================
 # ÍNDICE DE COMPROMETIMENTO
 # ============================================================
@@ -692,8 +850,9 @@ tab1, tab2 = st.tabs(["📊 Análise Dinâmica (PyGWalker)", "📋 Tabela"])
 
 with tab1:
     st.caption("Arraste os campos para linhas/colunas, mude o tipo de gráfico e crie seus próprios agrupamentos!")
-    renderer = StreamlitRenderer(df_filtrado.sort_values(["Ano", "Mês", "Nome"]).reset_index(drop=True))
-    renderer.explorer()
+    with trava_pygwalker():
+        renderer = StreamlitRenderer(df_filtrado.sort_values(["Ano", "Mês", "Nome"]).reset_index(drop=True))
+        renderer.explorer()
 
 with tab2:
     st.dataframe(
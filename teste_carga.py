@@ -0,0 +1,502 @@
+"""Teste de carga do dashboard da Ficha Financeira.
+
+Sobe um substituto local do Web Service do RM (wsConsultaSQL) e conduz N
+sessões simuladas do ``app.py`` via ``streamlit.testing.v1.AppTest`` pelo
+roteiro de um analista: conectar, consultar, mexer nos filtros, paginar as
+abas de comprometimento, gerar envelopes e comparar com o ano anterior.
+
+Cada sessão roda o roteiro na sua própria thread, todas no mesmo processo
+e liberadas juntas por uma barreira, como as threads de script de uma
+única instância do Streamlit disputando GIL e CPU. Ao final são informados
+vazão na janela concorrente, latência p50/p95 por interação e crescimento
+de RSS por sessão. O primeiro erro do app numa sessão (exceção, ``st.error``
+ou um roteiro que não consegue seguir) encerra só aquela sessão e entra no
+relatório; erros da sessão de aquecimento também são informados.
+
+O PyGWalker registra sua API HTTP no servidor tornado do Streamlit, que não
+existe sob o AppTest. Durante o teste esse registro vira uma operação vazia,
+de modo que o renderizador é construído normalmente (e entra na conta de
+memória por sessão); apenas a comunicação do navegador com ele fica de fora.
+
+Um travamento que segure o GIL não pode ser detectado de dentro do Python;
+``--limite-total-s`` arma um ``faulthandler`` que, esgotado o prazo, despeja
+a pilha de todas as threads e encerra o processo com código de saída 1.
+Limites opcionais transformam o relatório num portão de regressão (código
+de saída 1 quando algum limite é ultrapassado ou houve erro).
+
+Uso:
+    python teste_carga.py --sessoes 10
+    python teste_carga.py --sessoes 20 --max-p95-ms 1500 --max-rss-sessao-mb 40
+"""
+import argparse
+import faulthandler
+import gc
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from xml.sax.saxutils import escape
+
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = Path(__file__).with_name("app.py")
+
+# ============================================================
+# SUBSTITUTO LOCAL DO RM (wsConsultaSQL)
+# ============================================================
+WSDL_MODELO = """<?xml version="1.0" encoding="utf-8"?>
+<wsdl:definitions xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns:tns="http://www.totvs.com/"
+    targetNamespace="http://www.totvs.com/">
+  <wsdl:types>
+    <xs:schema elementFormDefault="qualified" targetNamespace="http://www.totvs.com/">
+      <xs:element name="RealizarConsultaSQL">
+        <xs:complexType><xs:sequence>
+          <xs:element minOccurs="0" name="codSentenca" type="xs:string"/>
+          <xs:element minOccurs="0" name="codColigada" type="xs:int"/>
+          <xs:element minOccurs="0" name="codSistema" type="xs:string"/>
+          <xs:element minOccurs="0" name="parameters" type="xs:string"/>
+        </xs:sequence></xs:complexType>
+      </xs:element>
+      <xs:element name="RealizarConsultaSQLResponse">
+        <xs:complexType><xs:sequence>
+          <xs:element minOccurs="0" name="RealizarConsultaSQLResult" type="xs:string"/>
+        </xs:sequence></xs:complexType>
+      </xs:element>
+    </xs:schema>
+  </wsdl:types>
+  <wsdl:message name="IwsConsultaSQL_RealizarConsultaSQL_InputMessage">
+    <wsdl:part name="parameters" element="tns:RealizarConsultaSQL"/>
+  </wsdl:message>
+  <wsdl:message name="IwsConsultaSQL_RealizarConsultaSQL_OutputMessage">
+    <wsdl:part name="parameters" element="tns:RealizarConsultaSQLResponse"/>
+  </wsdl:message>
+  <wsdl:portType name="IwsConsultaSQL">
+    <wsdl:operation name="RealizarConsultaSQL">
+      <wsdl:input message="tns:IwsConsultaSQL_RealizarConsultaSQL_InputMessage"/>
+      <wsdl:output message="tns:IwsConsultaSQL_RealizarConsultaSQL_OutputMessage"/>
+    </wsdl:operation>
+  </wsdl:portType>
+  <wsdl:binding name="RM_IwsConsultaSQL" type="tns:IwsConsultaSQL">
+    <soap:binding transport="http://schemas.xmlsoap.org/soap/http"/>
+    <wsdl:operation name="RealizarConsultaSQL">
+      <soap:operation soapAction="http://www.totvs.com/IwsConsultaSQL/RealizarConsultaSQL" style="document"/>
+      <wsdl:input><soap:body use="literal"/></wsdl:input>
+      <wsdl:output><soap:body use="literal"/></wsdl:output>
+    </wsdl:operation>
+  </wsdl:binding>
+  <wsdl:service name="wsConsultaSQL">
+    <wsdl:port name="RM_IwsConsultaSQL" binding="tns:RM_IwsConsultaSQL">
+      <soap:address location="__ENDERECO__/wsConsultaSQL/IwsConsultaSQL"/>
+    </wsdl:port>
+  </wsdl:service>
+</wsdl:definitions>
+"""
+
+RESPOSTA_MODELO = """<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <RealizarConsultaSQLResponse xmlns="http://www.totvs.com/">
+      <RealizarConsultaSQLResult>__RESULTADO__</RealizarConsultaSQLResult>
+    </RealizarConsultaSQLResponse>
+  </s:Body>
+</s:Envelope>
+"""
+
+FUNCOES  = ["Analista", "Assistente", "Auxiliar", "Coordenador", "Gerente", "Operador", "Supervisor", "Técnico"]
+SECOES   = ["Administrativo", "Comercial", "Financeiro", "Logística", "Produção", "RH", "TI"]
+EVENTOS  = [("Salário", "Provento"), ("Horas Extras", "Provento"), ("Adicional Noturno", "Provento"),
+            ("Vale Transporte", "Desconto"), ("INSS", "Desconto"), ("IRRF", "Desconto"),
+            ("Plano de Saúde", "Desconto"), ("Empréstimo Consignado", "Desconto")]
+
+
+@lru_cache(maxsize=None)
+def gerar_resultado(coligada: int, ano: int, funcionarios: int) -> str:
+    """XML da sentença FICHA_FINANCEIRA com dados sintéticos e determinísticos."""
+    rnd = random.Random(f"{coligada}-{ano}")
+    linhas = []
+    for f in range(funcionarios):
+        nome    = f"Funcionário {f + 1:04d}"
+        funcao  = FUNCOES[f % len(FUNCOES)]
+        secao   = SECOES[f % len(SECOES)]
+        salario = rnd.uniform(1800, 15000)
+        for mes in range(1, 13):
+            for evento, tipo in EVENTOS:
+                valor = salario if evento == "Salário" else salario * rnd.uniform(0.01, 0.15)
+                linhas.append(
+                    "<Resultado>"
+                    f"<CODCOLIGADA>{coligada}</CODCOLIGADA>"
+                    f"<NOMEFANTASIA>Coligada {coligada}</NOMEFANTASIA>"
+                    f"<NOME>{nome}</NOME><FUNCAO>{funcao}</FUNCAO><SECAO>{secao}</SECAO>"
+                    f"<TIPO_EVENTO>{tipo}</TIPO_EVENTO><EVENTO>{evento}</EVENTO>"
+                    f"<NROPERIODO>1</NROPERIODO><MESCOMP>{mes}</MESCOMP><ANOCOMP>{ano}</ANOCOMP>"
+                    f"<VALOR>{valor:.2f}</VALOR>"
+                    f"<VLR_PROV_DESC>{valor if tipo == 'Provento' else -valor:.2f}</VLR_PROV_DESC>"
+                    "</Resultado>"
+                )
+    return "<NewDataSet>" + "".join(linhas) + "</NewDataSet>"
+
+
+class ServidorRM(ThreadingHTTPServer):
+    """Servidor HTTP local que responde como o wsConsultaSQL do RM."""
+
+    daemon_threads = True
+
+    def __init__(self, funcionarios: int, latencia_ms: float = 0):
+        super().__init__(("127.0.0.1", 0), _TratadorRM)
+        self.funcionarios = funcionarios
+        self.latencia_ms  = latencia_ms
+        self.consultas    = 0
+        self.trava        = threading.Lock()
+        self.endereco     = f"http://127.0.0.1:{self.server_address[1]}"
+
+    def iniciar(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _TratadorRM(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, corpo: str):
+        dados = corpo.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        self._responder(WSDL_MODELO.replace("__ENDERECO__", self.server.endereco))
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        achado = re.search(r"parameters>([^<]*)<", corpo)
+        params = dict(p.split("=", 1) for p in (achado.group(1) if achado else "").split(";") if "=" in p)
+
+        if self.server.latencia_ms:
+            time.sleep(self.server.latencia_ms / 1000)
+        with self.server.trava:
+            self.server.consultas += 1
+
+        resultado = gerar_resultado(int(params.get("CODCOLIGADA", 1)), int(params.get("ANO", 2024)),
+                                    self.server.funcionarios)
+        self._responder(RESPOSTA_MODELO.replace("__RESULTADO__", escape(resultado)))
+
+
+# ============================================================
+# SESSÕES SIMULADAS
+# ============================================================
+def rss_mb():
+    """Memória residente (RSS) atual do processo em MB, ou None fora do Linux.
+
+    Não há alternativa na biblioteca padrão: ``ru_maxrss`` é o pico de RSS, e
+    diferenças entre picos não medem o crescimento por sessão.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        return None
+
+
+@contextmanager
+def pygwalker_sem_servidor():
+    """Desativa o registro da API do PyGWalker no servidor tornado do Streamlit.
+
+    ``StreamlitRenderer`` procura a ``tornado.web.Application`` do Streamlit
+    para registrar seus handlers e falha quando não a encontra, que é o caso
+    sob o AppTest. O restante do renderizador (dados e estado) é mantido.
+    """
+    with patch("pygwalker.api.streamlit.hack_streamlit_server", lambda: None):
+        yield
+
+
+@contextmanager
+def runtime_compartilhado():
+    """Mantém um Runtime simulado visível enquanto as sessões rodam em paralelo.
+
+    Cada ``AppTest.run`` instala o seu Runtime simulado e zera
+    ``Runtime._instance`` ao terminar; sem isso, a primeira sessão a terminar
+    uma execução derrubaria o Runtime das que ainda estão no meio do script.
+    """
+    reserva = MagicMock(spec=Runtime)
+    reserva.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    reserva.cache_storage_manager = MemoryCacheStorageManager()
+    with patch.object(Runtime, "instance", classmethod(lambda cls: cls._instance or reserva)), \
+         patch.object(Runtime, "exists", classmethod(lambda cls: True)):
+        yield
+
+
+class ErroApp(Exception):
+    """Erro exibido pelo app numa interação; encerra o roteiro da sessão."""
+
+
+NUM_MES = {"Jan": 1, "Fev": 2, "Mar": 3, "Abr": 4, "Mai": 5, "Jun": 6,
+           "Jul": 7, "Ago": 8, "Set": 9, "Out": 10, "Nov": 11, "Dez": 12}
+
+
+def _por_rotulo(elementos, rotulo: str, indice: int = 0):
+    return [e for e in elementos if e.label == rotulo][indice]
+
+
+class Sessao:
+    """Um analista simulado: um AppTest próprio com seu session_state."""
+
+    def __init__(self, numero: int, servidor: ServidorRM, ano: int, timeout: float):
+        self.numero    = numero
+        self.servidor  = servidor
+        self.ano       = ano
+        self.timeout   = timeout
+        self.rnd       = random.Random(numero)
+        self.at        = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        self.latencias = []   # (etapa, segundos)
+        self.erros     = []
+        self.etapa     = None
+
+    def _interagir(self, etapa: str, acao=None):
+        self.etapa = etapa
+        if acao is not None:
+            acao(self.at)
+        inicio = time.perf_counter()
+        self.at.run(timeout=self.timeout)
+        self.latencias.append((etapa, time.perf_counter() - inicio))
+        mensagens = [exc.message for exc in self.at.exception] + [erro.value for erro in self.at.error]
+        if mensagens:
+            raise ErroApp(" | ".join(mensagens))
+
+    def conectar(self):
+        self._interagir("abrir")
+
+        def preencher(at):
+            _por_rotulo(at.text_input, "🌐 Endereço do Servidor").set_value(self.servidor.endereco)
+            _por_rotulo(at.text_input, "👤 Usuário").set_value("mestre")
+            _por_rotulo(at.text_input, "🔒 Senha").set_value("carga")
+            _por_rotulo(at.button, "💾 Salvar Configurações").click()
+        self._interagir("conectar", preencher)
+
+    def consultar(self, ano: int = None, etapa: str = "consultar"):
+        def preencher(at):
+            _por_rotulo(at.text_input, "Coligada").set_value("1")
+            _por_rotulo(at.number_input, "Ano").set_value(ano or self.ano)
+            _por_rotulo(at.button, "🔎 Consultar").click()
+        self._interagir(etapa, preencher)
+
+    def filtrar(self):
+        self._interagir("filtro_tipo", lambda at: _por_rotulo(at.multiselect, "Tipo de Evento").set_value(["Provento", "Desconto"]))
+
+        mes_inicio = self.rnd.randint(1, 6)
+        self._interagir("filtro_meses", lambda at: _por_rotulo(at.slider, "📅 Intervalo de Mês").set_range(mes_inicio, 12))
+
+        def escolher_funcionario(at):
+            caixa = _por_rotulo(at.selectbox, "👤 Funcionário")
+            caixa.set_value(self.rnd.choice(caixa.options[1:] or caixa.options))
+        self._interagir("filtro_funcionario", escolher_funcionario)
+        self._interagir("filtro_todos", lambda at: _por_rotulo(at.selectbox, "👤 Funcionário").set_value("Todos"))
+
+        self._interagir("filtro_valor", lambda at: _por_rotulo(at.radio, "💰 Tipo de Valor — Gastos por Função e Seção").set_value("Valor Líquido"))
+
+    def paginar(self, paginas: int = 2):
+        for agrup in ["Nome", "Seção", "Função"]:
+            for _ in range(paginas):
+                botao = self.at.button(key=f"next_{agrup}")
+                if botao.disabled:
+                    break
+                self._interagir(f"paginar_{agrup}", lambda at, b=botao: b.click())
+        self._interagir("limiar", lambda at: _por_rotulo(at.slider, "⚠️ Limiar de alerta (%)").set_value(self.rnd.choice([20, 40, 60])))
+
+    def gerar_envelopes(self, quantidade: int = 2):
+        for _ in range(quantidade):
+            def preencher(at):
+                func = at.selectbox(key="env_func")
+                func.select_index(self.rnd.randrange(len(func.options)))
+                # As opções exibidas são "Jan"…"Dez" (format_func do app); o valor é o mês
+                mes = at.selectbox(key="env_mes")
+                mes.set_value(NUM_MES[self.rnd.choice(mes.options)])
+            self._interagir("envelope_selecionar", preencher)
+            self._interagir("envelope_gerar", lambda at: _por_rotulo(at.button, "📄 Gerar Envelope").click())
+
+    def comparar(self):
+        self.consultar(self.ano - 1, etapa="consultar_ano_anterior")
+        self._interagir("comparativo", lambda at: at.radio(key="comp_medida").set_value("Proventos"))
+
+    def roteiro(self, barreira: threading.Barrier = None):
+        """Executa todas as etapas do analista; uma falha encerra só esta sessão."""
+        if barreira is not None:
+            barreira.wait()
+        try:
+            self.conectar()
+            self.consultar()
+            self.filtrar()
+            self.paginar()
+            self.gerar_envelopes()
+            self.comparar()
+        except ErroApp as e:
+            self.erros.append(f"{self.etapa}: {e}")
+        except Exception as e:
+            self.erros.append(f"{self.etapa}: roteiro interrompido — {type(e).__name__}: {e}")
+
+
+def _percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def executar(sessoes: int, funcionarios: int, ano: int, latencia_rm_ms: float, timeout: float) -> dict:
+    servidor = ServidorRM(funcionarios, latencia_rm_ms).iniciar()
+    try:
+        with pygwalker_sem_servidor():
+            # Aquecimento: importações e caches do primeiro script não entram na conta
+            # por sessão. A sessão fica viva até a medição final para que a memória
+            # liberada por ela não seja reaproveitada pelas sessões medidas.
+            aquecimento = Sessao(-1, servidor, ano, timeout)
+            aquecimento.roteiro()
+            # Com erro no aquecimento a linha de base de RSS fica incompleta; o
+            # erro entra no relatório e reprova o portão
+            gc.collect()
+            rss_inicial = rss_mb()
+
+            ativas   = [Sessao(i, servidor, ano, timeout) for i in range(sessoes)]
+            janela   = {}
+            barreira = threading.Barrier(sessoes, action=lambda: janela.setdefault("inicio", time.perf_counter()))
+
+            with runtime_compartilhado(), ThreadPoolExecutor(max_workers=sessoes) as executor:
+                for futuro in [executor.submit(s.roteiro, barreira) for s in ativas]:
+                    futuro.result()
+            duracao = time.perf_counter() - janela["inicio"]
+
+            gc.collect()
+            rss_final = rss_mb()
+            erros_aquecimento = aquecimento.erros
+            del aquecimento
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    todas = [seg for s in ativas for _, seg in s.latencias]
+    etapas = {}
+    for s in ativas:
+        for etapa, seg in s.latencias:
+            etapas.setdefault(etapa, []).append(seg)
+
+    return {
+        "sessoes":            sessoes,
+        "funcionarios":       funcionarios,
+        "interacoes":         len(todas),
+        "consultas_rm":       servidor.consultas,
+        "duracao_s":          round(duracao, 2),
+        "vazao_interacoes_s": round(len(todas) / duracao, 2) if duracao else 0.0,
+        "latencia_p50_ms":    round(_percentil(todas, 50) * 1000, 1),
+        "latencia_p95_ms":    round(_percentil(todas, 95) * 1000, 1),
+        "rss_inicial_mb":     None if rss_inicial is None else round(rss_inicial, 1),
+        "rss_final_mb":       None if rss_final is None else round(rss_final, 1),
+        "rss_por_sessao_mb":  None if rss_inicial is None else round((rss_final - rss_inicial) / sessoes, 2),
+        "etapas": {
+            etapa: {"n": len(v), "p50_ms": round(_percentil(v, 50) * 1000, 1),
+                    "p95_ms": round(_percentil(v, 95) * 1000, 1)}
+            for etapa, v in etapas.items()
+        },
+        "erros": [f"aquecimento — {e}" for e in erros_aquecimento]
+               + [f"sessão {s.numero} — {e}" for s in ativas for e in s.erros],
+    }
+
+
+# ============================================================
+# RELATÓRIO E PORTÃO DE REGRESSÃO
+# ============================================================
+def imprimir(relatorio: dict):
+    print(f"Sessões simultâneas : {relatorio['sessoes']} ({relatorio['funcionarios']} funcionários por ano)")
+    print(f"Interações          : {relatorio['interacoes']} em {relatorio['duracao_s']} s "
+          f"({relatorio['consultas_rm']} consultas ao RM)")
+    print(f"Vazão               : {relatorio['vazao_interacoes_s']} interações/s")
+    print(f"Latência p50 / p95  : {relatorio['latencia_p50_ms']} ms / {relatorio['latencia_p95_ms']} ms")
+    if relatorio["rss_por_sessao_mb"] is None:
+        print("RSS                 : indisponível (requer /proc; somente Linux)")
+    else:
+        print(f"RSS inicial / final : {relatorio['rss_inicial_mb']} MB / {relatorio['rss_final_mb']} MB")
+        print(f"RSS por sessão      : {relatorio['rss_por_sessao_mb']} MB")
+    print()
+    print(f"{'Etapa':<26}{'n':>6}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    for etapa, e in relatorio["etapas"].items():
+        print(f"{etapa:<26}{e['n']:>6}{e['p50_ms']:>12}{e['p95_ms']:>12}")
+    if relatorio["erros"]:
+        print()
+        print(f"{len(relatorio['erros'])} erro(s):")
+        for erro in relatorio["erros"][:20]:
+            print(f"  - {erro}")
+
+
+def verificar_limites(relatorio: dict, args) -> list:
+    """Lista os limites do portão de regressão que foram ultrapassados."""
+    falhas = []
+    if relatorio["erros"]:
+        falhas.append(f"{len(relatorio['erros'])} erro(s) durante as sessões")
+    if args.max_p95_ms is not None and relatorio["latencia_p95_ms"] > args.max_p95_ms:
+        falhas.append(f"latência p95 {relatorio['latencia_p95_ms']} ms > {args.max_p95_ms} ms")
+    if args.max_rss_sessao_mb is not None and relatorio["rss_por_sessao_mb"] is None:
+        falhas.append("RSS por sessão indisponível nesta plataforma para --max-rss-sessao-mb")
+    elif args.max_rss_sessao_mb is not None and relatorio["rss_por_sessao_mb"] > args.max_rss_sessao_mb:
+        falhas.append(f"RSS por sessão {relatorio['rss_por_sessao_mb']} MB > {args.max_rss_sessao_mb} MB")
+    if args.min_vazao is not None and relatorio["vazao_interacoes_s"] < args.min_vazao:
+        falhas.append(f"vazão {relatorio['vazao_interacoes_s']} interações/s < {args.min_vazao}")
+    return falhas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard da Ficha Financeira.")
+    parser.add_argument("--sessoes", type=int, default=10, help="Quantidade de sessões simultâneas")
+    parser.add_argument("--funcionarios", type=int, default=150, help="Funcionários por ano no RM simulado")
+    parser.add_argument("--ano", type=int, default=2024, help="Ano consultado (o anterior é usado no comparativo)")
+    parser.add_argument("--latencia-rm-ms", type=float, default=0, help="Atraso artificial de cada consulta ao RM")
+    parser.add_argument("--timeout", type=float, default=120, help="Tempo máximo de cada execução do script (s)")
+    parser.add_argument("--max-p95-ms", type=float, help="Falha se a latência p95 ultrapassar este valor")
+    parser.add_argument("--max-rss-sessao-mb", type=float, help="Falha se o RSS por sessão ultrapassar este valor")
+    parser.add_argument("--min-vazao", type=float, help="Falha se a vazão (interações/s) ficar abaixo deste valor")
+    parser.add_argument("--limite-total-s", type=float, default=1800,
+                        help="Aborta com a pilha das threads se o teste não terminar neste prazo (0 desativa)")
+    parser.add_argument("--json", metavar="ARQUIVO", help="Grava o relatório completo em JSON")
+    args = parser.parse_args(argv)
+    if args.sessoes < 1:
+        parser.error("--sessoes deve ser pelo menos 1")
+
+    if args.limite_total_s:
+        faulthandler.dump_traceback_later(args.limite_total_s, exit=True)
+    relatorio = executar(args.sessoes, args.funcionarios, args.ano, args.latencia_rm_ms, args.timeout)
+    faulthandler.cancel_dump_traceback_later()
+    imprimir(relatorio)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    falhas = verificar_limites(relatorio, args)
+    if falhas:
+        print()
+        print("❌ Portão de regressão reprovado:")
+        for falha in falhas:
+            print(f"  - {falha}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())